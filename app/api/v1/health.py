@@ -1,6 +1,6 @@
 """Health check API endpoints."""
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, Response, status
 from pydantic import BaseModel
 
 router = APIRouter(prefix="/health", tags=["Health"])
@@ -13,16 +13,20 @@ class HealthResponse(BaseModel):
     service: str
 
 
+# Health payload is static, so serialize it once instead of per probe
+_HEALTHY_BODY = HealthResponse(
+    status="healthy",
+    service="infra-mind-api",
+).model_dump_json().encode()
+
+
 @router.get(
     "",
-    response_model=HealthResponse,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": HealthResponse}},
     summary="Health check",
     description="Returns application health status.",
 )
-async def health_check() -> HealthResponse:
+async def health_check() -> Response:
     """Health check endpoint."""
-    return HealthResponse(
-        status="healthy",
-        service="infra-mind-api",
-    )
+    return Response(content=_HEALTHY_BODY, media_type="application/json")
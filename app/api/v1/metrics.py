@@ -2,26 +2,45 @@
 
 from datetime import datetime
 
-from fastapi import APIRouter, HTTPException, Query, status
-from pydantic import BaseModel, Field
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
+from app.core.limits import enforce_max_body_size, limit_ingest_rate, read_body_limited
 from app.core.prometheus import METRICS_INGESTED, ANOMALY_CHECKS
-from app.services.anomaly_service import AnomalyResult, detect_anomaly
+from app.services.anomaly_service import (
+    AnomalyResult,
+    AnomalyStatus,
+    detect_anomaly,
+    insufficient_data_result,
+)
+from app.services.ingest_buffer import ingest_buffer
 from app.services.metric_service import MetricEntry, metric_service
 
 router = APIRouter(prefix="/metrics", tags=["Metrics"])
 
+# Upper bound on entries accepted in a single batch request
+MAX_BATCH_SIZE = 10000
+
 
 class MetricIngest(BaseModel):
     """Schema for metrics ingestion with validation."""
     
-    resource_id: str
+    resource_id: str = Field(..., pattern=r"\S", description="Resource identifier (must not be blank)")
     cpu_usage: float = Field(..., ge=0, le=100, description="CPU usage percentage (0-100)")
     memory_usage: float = Field(..., ge=0, le=100, description="Memory usage percentage (0-100)")
     gpu_usage: float = Field(..., ge=0, le=100, description="GPU usage percentage (0-100)")
     timestamp: datetime
 
 
+class BatchIngest(BaseModel):
+    """Schema for batch metrics ingestion."""
+    
+    metrics: list[MetricIngest] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
 class IngestResponse(BaseModel):
     """Response for metric ingestion."""
     
@@ -29,9 +48,18 @@ class IngestResponse(BaseModel):
     resource_id: str
 
 
+class BatchIngestResponse(BaseModel):
+    """Response for batch metric ingestion."""
+    
+    message: str
+    ingested: int
+
+
 class MetricResponse(BaseModel):
     """Response for metric data."""
     
+    model_config = ConfigDict(from_attributes=True)
+    
     resource_id: str
     cpu_usage: float
     memory_usage: float
@@ -39,29 +67,137 @@ class MetricResponse(BaseModel):
     timestamp: datetime
 
 
+class DebugMetricPoint(BaseModel):
+    """Single stored metric in the debug view.
+    
+    Validation aliases let rows be read straight off stored entries.
+    """
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    cpu: float = Field(validation_alias="cpu_usage")
+    memory: float = Field(validation_alias="memory_usage")
+    gpu: float = Field(validation_alias="gpu_usage")
+    timestamp: datetime
+
+
+class DebugMetricsResponse(BaseModel):
+    """Response for the debug metrics view."""
+    
+    model_config = ConfigDict(from_attributes=True)
+    
+    resource_id: str
+    total_count: int
+    metrics: list[DebugMetricPoint]
+
+
+# Request body schema for the batch route, which validates the raw body itself
+_BATCH_SCHEMA = BatchIngest.model_json_schema(ref_template="#/components/schemas/{model}")
+_BATCH_SCHEMA.pop("$defs", None)
+
+
+def _to_entry(metric: MetricIngest) -> MetricEntry:
+    """Convert a validated ingest payload into a store entry."""
+    return MetricEntry(
+        resource_id=metric.resource_id,
+        cpu_usage=metric.cpu_usage,
+        memory_usage=metric.memory_usage,
+        gpu_usage=metric.gpu_usage,
+        timestamp=metric.timestamp,
+    )
+
+
 @router.post(
     "/ingest",
-    response_model=IngestResponse,
     status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_200_OK: {"model": IngestResponse, "description": "Metric stored"},
+        status.HTTP_202_ACCEPTED: {
+            "model": IngestResponse,
+            "description": "Metric queued (ingest buffering enabled)",
+        },
+    },
     summary="Ingest metrics",
-    description="Accept resource metrics for ingestion.",
+    description="Accept resource metrics for ingestion. Returns 200 once the metric is stored. "
+                "When ingest buffering is enabled, returns 202 instead: the metric is queued "
+                "and becomes visible to reads after the next batch flush.",
 )
-async def ingest_metrics(metrics: MetricIngest) -> IngestResponse:
-    """Ingest a metric into the time-series store."""
-    entry = MetricEntry(
-        resource_id=metrics.resource_id,
-        cpu_usage=metrics.cpu_usage,
-        memory_usage=metrics.memory_usage,
-        gpu_usage=metrics.gpu_usage,
-        timestamp=metrics.timestamp,
-    )
-    metric_service.add_metric(entry)
-    METRICS_INGESTED.inc()
+async def ingest_metrics(metrics: MetricIngest) -> Response:
+    """Ingest a metric into the time-series store.
     
-    return IngestResponse(
-        message="Metric ingested",
+    With buffering enabled the metric is queued and written by the
+    background flusher (202 Accepted); otherwise it is written
+    synchronously (200 OK).
+    """
+    entry = _to_entry(metrics)
+    if settings.ingest_buffered:
+        ingest_buffer.enqueue(entry)
+        message, status_code = "Metric accepted for ingestion", status.HTTP_202_ACCEPTED
+    else:
+        metric_service.add_metric(entry)
+        METRICS_INGESTED.inc()
+        message, status_code = "Metric ingested", status.HTTP_200_OK
+    
+    # Server-built response: skip model validation and FastAPI's response revalidation
+    body = IngestResponse.model_construct(
+        message=message,
         resource_id=metrics.resource_id,
-    )
+    ).model_dump_json()
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+@router.post(
+    "/ingest/batch",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": BatchIngestResponse}},
+    summary="Ingest metrics in bulk",
+    description="Accept a batch of resource metrics and store them in one operation. "
+                "Payload size and per-client request rate are limited.",
+    dependencies=[Depends(enforce_max_body_size), Depends(limit_ingest_rate)],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": _BATCH_SCHEMA}},
+        },
+    },
+)
+async def ingest_metrics_batch(request: Request) -> Response:
+    """Ingest a batch of metrics with a single store write.
+    
+    The raw body is validated with pydantic-core directly, skipping the
+    intermediate Python objects FastAPI builds when parsing JSON itself.
+    """
+    raw = await read_body_limited(request)
+    try:
+        batch = BatchIngest.model_validate_json(raw)
+    except ValidationError as e:
+        errors = []
+        for err in e.errors(include_url=False):
+            err = {**err, "loc": ("body", *err["loc"])}
+            if err["type"] == "json_invalid":
+                # The input is the whole raw body; don't echo it back
+                # (FastAPI's own JSON parsing reports {} here too)
+                err["input"] = {}
+            errors.append(err)
+        raise RequestValidationError(errors, body=raw)
+    
+    entries = [_to_entry(m) for m in batch.metrics]
+    
+    try:
+        metric_service.add_metrics(entries)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    
+    METRICS_INGESTED.inc(len(entries))
+    
+    body = BatchIngestResponse.model_construct(
+        message="Metrics ingested",
+        ingested=len(entries),
+    ).model_dump_json()
+    return Response(content=body, media_type="application/json")
 
 
 @router.get(
@@ -81,13 +217,7 @@ async def get_latest_metric(resource_id: str) -> MetricResponse:
             detail=f"No metrics found for resource '{resource_id}'",
         )
     
-    return MetricResponse(
-        resource_id=metric.resource_id,
-        cpu_usage=metric.cpu_usage,
-        memory_usage=metric.memory_usage,
-        gpu_usage=metric.gpu_usage,
-        timestamp=metric.timestamp,
-    )
+    return MetricResponse.model_validate(metric)
 
 
 @router.get(
@@ -101,9 +231,19 @@ async def analyze_metrics(
     resource_id: str,
     window_size: int = Query(10, ge=2, le=100, description="Rolling window size"),
 ) -> AnomalyResult:
-    """Analyze metrics for anomalies."""
+    """Analyze metrics for anomalies.
+    
+    Resources without any stored metrics are answered from an O(1) count;
+    otherwise the Z-score computation runs on the threadpool so it doesn't
+    block the event loop.
+    """
     try:
-        result = detect_anomaly(resource_id, window_size=window_size)
+        # The count includes metrics outside the lookback, so it can only
+        # stand in for detect_anomaly's answer when it is zero
+        if metric_service.count(resource_id) == 0:
+            result = insufficient_data_result(resource_id, 0, window_size)
+        else:
+            result = await run_in_threadpool(detect_anomaly, resource_id, window_size=window_size)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -113,7 +253,7 @@ async def analyze_metrics(
     ANOMALY_CHECKS.inc()
     
     # Return 404 if insufficient data
-    if result.status.value == "INSUFFICIENT_DATA":
+    if result.status == AnomalyStatus.INSUFFICIENT_DATA:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=result.explanation,
@@ -125,25 +265,27 @@ async def analyze_metrics(
 @router.get(
     "/{resource_id}/debug",
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": DebugMetricsResponse}},
     summary="Debug: View stored metrics",
     description="Debug endpoint to view all stored metrics for a resource.",
 )
-async def debug_metrics(resource_id: str) -> dict:
-    """Debug endpoint to view stored metrics."""
-    metrics = metric_service.get_metrics_last_n_minutes(resource_id, minutes=60)
+async def debug_metrics(resource_id: str) -> Response:
+    """Debug endpoint to view stored metrics.
     
-    return {
+    Rows are read from the stored entries and encoded to JSON by
+    pydantic-core in one pass, without building per-row dicts in Python
+    or re-validating the response.
+    """
+    metrics = await run_in_threadpool(
+        metric_service.get_metrics_last_n_minutes, resource_id, minutes=60
+    )
+    
+    body = DebugMetricsResponse.model_validate({
         "resource_id": resource_id,
         "total_count": len(metrics),
-        "metrics": [
-            {
-                "cpu": m.cpu_usage,
-                "memory": m.memory_usage,
-                "gpu": m.gpu_usage,
-                "timestamp": m.timestamp.isoformat(),
-            }
-            for m in metrics
-        ],
-    }
+        "metrics": metrics,
+    }).model_dump_json()
+    
+    return Response(content=body, media_type="application/json")
 
 
@@ -4,14 +4,36 @@ Note: The /risk endpoint provides PREDICTIVE risk assessment,
 not SLA compliance measurement.
 """
 
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
 from fastapi import APIRouter, HTTPException, Query, status
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from app.core.prometheus import SLA_RISK_CHECKS, SLA_HIGH_RISK
 from app.services.sla_risk_service import RiskLevel, RiskStatus, SLARiskResult, compute_sla_risk
 
 router = APIRouter(prefix="/sla", tags=["SLA"])
 
+logger = logging.getLogger(__name__)
+
+# Risk results are reused for RISK_FRESH_SECONDS. Until RISK_STALE_SECONDS
+# the last result is served while a background refresh recomputes it.
+RISK_FRESH_SECONDS = 1.0
+RISK_STALE_SECONDS = 5.0
+
+# Cached results beyond this many are evicted, oldest first
+MAX_CACHED_RISK_RESULTS = 10000
+
+_RiskKey = tuple[str, int]
+
+# Ordered oldest to newest computation
+_risk_cache: OrderedDict[_RiskKey, tuple[float, SLARiskResult]] = OrderedDict()
+_risk_inflight: dict[_RiskKey, asyncio.Task] = {}
+
 
 class SLAResponse(BaseModel):
     """SLA status response schema."""
@@ -30,13 +52,49 @@ class SLAResponse(BaseModel):
 )
 async def get_sla(resource_id: str) -> SLAResponse:
     """Get SLA status for a resource (placeholder)."""
-    return SLAResponse(
+    return SLAResponse.model_construct(
         resource_id=resource_id,
         sla_target="99.9%",
         current_status="OK",
     )
 
 
+async def _compute_risk(key: _RiskKey) -> SLARiskResult:
+    """Compute and cache the risk result for (resource_id, lookback_minutes)."""
+    resource_id, lookback_minutes = key
+    # CPU-bound: run off the event loop
+    result = await run_in_threadpool(
+        compute_sla_risk, resource_id, lookback_minutes=lookback_minutes
+    )
+    
+    _risk_cache[key] = (time.monotonic(), result)
+    _risk_cache.move_to_end(key)
+    if len(_risk_cache) > MAX_CACHED_RISK_RESULTS:
+        _risk_cache.popitem(last=False)
+    return result
+
+
+def _refresh_done(key: _RiskKey, task: asyncio.Task) -> None:
+    """Release the in-flight slot and report failures of the computation.
+    
+    Retrieving the exception here also covers background refreshes that no
+    request awaits; awaiting requests still receive it.
+    """
+    _risk_inflight.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("SLA risk computation failed for %s", key, exc_info=task.exception())
+
+
+def _refresh_risk(key: _RiskKey) -> asyncio.Task:
+    """Start a risk computation, or join the one already in flight for key."""
+    task = _risk_inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_compute_risk(key))
+        _risk_inflight[key] = task
+        task.add_done_callback(lambda done: _refresh_done(key, done))
+    return task
+
+
 @router.get(
     "/{resource_id}/risk",
     response_model=SLARiskResult,
@@ -51,11 +109,25 @@ async def get_sla_risk(
 ) -> SLARiskResult:
     """Compute predictive SLA risk for a resource.
     
+    Concurrent requests for the same resource and lookback share one
+    computation, and recent results are reused (see RISK_FRESH_SECONDS).
+    
     Raises:
         HTTPException 400: Invalid parameters
         HTTPException 404: Insufficient data
     """
-    result = compute_sla_risk(resource_id, lookback_minutes=lookback_minutes)
+    key = (resource_id, lookback_minutes)
+    cached = _risk_cache.get(key)
+    now = time.monotonic()
+    
+    if cached is not None and now - cached[0] < RISK_STALE_SECONDS:
+        computed_at, result = cached
+        if now - computed_at >= RISK_FRESH_SECONDS:
+            # Serve the stale result and revalidate in the background
+            _refresh_risk(key)
+    else:
+        # Shielded so a disconnecting client doesn't cancel the shared task
+        result = await asyncio.shield(_refresh_risk(key))
     
     SLA_RISK_CHECKS.inc()
     
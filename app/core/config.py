@@ -10,12 +10,31 @@ class Settings(BaseSettings):
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        # Read-only after startup: values derived from settings at import
+        # time (buffer and limiter singletons) can't drift from them
+        frozen=True,
     )
     
     # Application settings with defaults for local development
     app_name: str = "infra-mind-api"
     env: str = "development"
     debug: bool = True
+    
+    # Worker processes serving the app (WEB_CONCURRENCY, as read by gunicorn)
+    web_concurrency: int = 1
+    
+    # Ingestion buffering: single-metric ingests are queued and flushed
+    # to the store in batches (202 Accepted, visible after the next flush).
+    # Off by default so ingestion is synchronous (read-your-writes).
+    ingest_buffered: bool = False
+    ingest_batch_max: int = 500
+    ingest_flush_ms: int = 100
+    
+    # Batch ingestion limits: max body size and per-client request rate
+    # (requests/second with a burst allowance; rate <= 0 disables limiting)
+    max_ingest_bytes: int = 16 * 1024 * 1024
+    ingest_rate_limit: float = 20.0
+    ingest_rate_burst: int = 40
 
 
 # Create settings instance
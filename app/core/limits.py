@@ -0,0 +1,125 @@
+"""Request limits for ingestion endpoints.
+
+- Body size gate: rejects oversized payloads before the body is buffered
+- Per-client token bucket rate limiting
+"""
+
+import math
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+
+# Buckets beyond this many are evicted, least recently seen first
+MAX_TRACKED_CLIENTS = 10000
+
+
+def _payload_too_large() -> HTTPException:
+    return HTTPException(
+        # Literal: the status constant's name differs across Starlette versions
+        status_code=413,
+        detail=f"Payload exceeds {settings.max_ingest_bytes} bytes",
+    )
+
+
+async def enforce_max_body_size(request: Request) -> None:
+    """Reject requests whose declared Content-Length exceeds max_ingest_bytes.
+    
+    Raises:
+        HTTPException 400: Malformed Content-Length header
+        HTTPException 413: Declared payload too large
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is None:
+        # Chunked bodies are bounded while reading, see read_body_limited()
+        return
+    try:
+        declared = int(content_length)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid Content-Length header",
+        )
+    if declared > settings.max_ingest_bytes:
+        raise _payload_too_large()
+
+
+async def read_body_limited(request: Request) -> bytes:
+    """Read the request body, aborting once it exceeds max_ingest_bytes.
+    
+    Covers bodies sent without a Content-Length header.
+    
+    Raises:
+        HTTPException 413: Payload too large
+    """
+    chunks = []
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > settings.max_ingest_bytes:
+            raise _payload_too_large()
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class TokenBucketLimiter:
+    """Thread-safe per-key token bucket.
+    
+    Each key refills at `rate` tokens per second up to `burst` tokens;
+    every request consumes one token. At most MAX_TRACKED_CLIENTS buckets
+    are kept; the least recently seen bucket, which has been refilling the
+    longest, is evicted first, in O(1).
+    """
+    
+    def __init__(self, rate: float, burst: float):
+        self._rate = rate
+        self._burst = burst
+        # Ordered least to most recently seen
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
+    
+    def acquire(self, key: str) -> float:
+        """Consume a token for key.
+        
+        Returns:
+            0.0 if the request is allowed, otherwise seconds until a token is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self._burst, now))
+            tokens = min(self._burst, tokens + (now - last) * self._rate)
+            
+            allowed = tokens >= 1.0
+            self._buckets[key] = (tokens - 1.0 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+            
+            return 0.0 if allowed else (1.0 - tokens) / self._rate
+
+
+ingest_rate_limiter = TokenBucketLimiter(
+    rate=settings.ingest_rate_limit,
+    burst=settings.ingest_rate_burst,
+)
+
+
+async def limit_ingest_rate(request: Request) -> None:
+    """Apply the per-client ingestion rate limit.
+    
+    Raises:
+        HTTPException 429: Client exceeded its rate limit
+    """
+    if settings.ingest_rate_limit <= 0:
+        return
+    client = request.client.host if request.client else "unknown"
+    retry_after = ingest_rate_limiter.acquire(client)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Ingestion rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
@@ -1,9 +1,15 @@
 """Prometheus metrics middleware for FastAPI."""
 
+import gzip
+import itertools
+import re
 import time
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
 
 from fastapi import Request, Response
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response as StarletteResponse
 
@@ -22,38 +28,121 @@ REQUEST_LATENCY = Histogram(
     buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0],
 )
 
+# Dynamic path segments: numeric IDs, and UUIDs or other hyphenated
+# IDs longer than 10 characters
+_ID_SEGMENT_RE = re.compile(r"(?<=/)(?:\d+|(?=[^/]*-)[^/]{11,})(?=/|\Z)")
+
+
+@lru_cache(maxsize=2048)
+def _normalize_path(path: str) -> str:
+    """Replace dynamic path segments with an {id} placeholder."""
+    return _ID_SEGMENT_RE.sub("{id}", path)
+
+
+def _route_template(path: str, template: str) -> str:
+    """Build the full route template for a request path.
+    
+    Depending on the FastAPI version, a matched route's path may omit the
+    prefix added by include_router(); the leading segments of the request
+    path that the template doesn't cover are that prefix.
+    """
+    return path.rsplit("/", template.count("/"))[0] + template
+
+
+class BatchedCounter:
+    """Counter wrapper that defers increments and applies them in bulk.
+    
+    inc() only advances an itertools.count (a single C call, atomic under
+    the GIL) instead of taking the Counter's value lock on every request.
+    Pending increments are applied by flush(), which runs before every
+    scrape, so exported values are always exact. Between scrapes, the
+    Counter is also brought up to date every `flush_every` events.
+    """
+    
+    def __init__(self, counter: Counter, flush_every: int = 64):
+        self._counter = counter
+        self._flush_every = flush_every
+        self._events = itertools.count()
+        self._flushes = 0
+        self._flushed = 0
+        self._flush_lock = Lock()
+        _BATCHED_COUNTERS.append(self)
+    
+    def inc(self, amount: int = 1) -> None:
+        """Record `amount` events.
+        
+        Only single events are deferred: larger amounts come from batch
+        writes, which already amortize the Counter's lock, so they are
+        applied directly.
+        """
+        if amount != 1:
+            self._counter.inc(amount)
+            return
+        if next(self._events) % self._flush_every == 0:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Apply pending increments to the underlying Counter."""
+        with self._flush_lock:
+            # next() returns the number of prior calls: all inc()s plus earlier flushes
+            total = next(self._events) - self._flushes
+            self._flushes += 1
+            pending = total - self._flushed
+            self._flushed = total
+        if pending:
+            self._counter.inc(pending)
+
+
+_BATCHED_COUNTERS: list[BatchedCounter] = []
+
+
+def flush_batched_counters() -> None:
+    """Apply all pending BatchedCounter increments."""
+    for counter in _BATCHED_COUNTERS:
+        counter.flush()
+
+
 # Custom business metrics
-METRICS_INGESTED = Counter(
+METRICS_INGESTED = BatchedCounter(Counter(
     "metrics_ingested_total",
     "Total metrics ingested",
-)
+))
 
-ANOMALY_CHECKS = Counter(
+ANOMALY_CHECKS = BatchedCounter(Counter(
     "anomaly_checks_total",
     "Total anomaly detection checks",
-)
+))
 
-SLA_RISK_CHECKS = Counter(
+SLA_RISK_CHECKS = BatchedCounter(Counter(
     "sla_risk_checks_total",
     "Total SLA risk assessments",
-)
+))
 
-SLA_HIGH_RISK = Counter(
+SLA_HIGH_RISK = BatchedCounter(Counter(
     "sla_high_risk_total",
     "Total high risk SLA assessments",
+))
+
+INGEST_QUEUE_DEPTH = Gauge(
+    "ingest_queue_depth",
+    "Metrics buffered and waiting to be flushed to the store",
 )
 
 
 class PrometheusMiddleware(BaseHTTPMiddleware):
     """Middleware to track HTTP request metrics."""
     
+    def __init__(self, app):
+        super().__init__(app)
+        # Bound label children, so repeat requests skip the labels() lookup
+        self._count_children: dict[tuple, Counter] = {}
+        self._latency_children: dict[tuple, Histogram] = {}
+    
     async def dispatch(self, request: Request, call_next) -> Response:
         # Skip metrics endpoint to avoid self-tracking
         if request.url.path == "/metrics":
             return await call_next(request)
         
-        # Normalize path to avoid high cardinality
-        path = self._normalize_path(request.url.path)
         method = request.method
         
         # Track request timing
@@ -61,51 +150,105 @@ class PrometheusMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
         duration = time.perf_counter() - start_time
         
+        # Label with the matched route template to bound cardinality;
+        # normalize the raw path only for requests no route matched
+        route = request.scope.get("route")
+        if route is not None:
+            path = _route_template(request.url.path, route.path)
+        else:
+            path = self._normalize_path(request.url.path)
+        
         # Record metrics
-        REQUEST_COUNT.labels(
-            method=method,
-            path=path,
-            status_code=response.status_code,
-        ).inc()
+        count_key = (method, path, response.status_code)
+        counter = self._count_children.get(count_key)
+        if counter is None:
+            counter = self._count_children[count_key] = REQUEST_COUNT.labels(*count_key)
+        counter.inc()
         
-        REQUEST_LATENCY.labels(
-            method=method,
-            path=path,
-        ).observe(duration)
+        latency_key = (method, path)
+        histogram = self._latency_children.get(latency_key)
+        if histogram is None:
+            histogram = self._latency_children[latency_key] = REQUEST_LATENCY.labels(*latency_key)
+        histogram.observe(duration)
         
         return response
     
     def _normalize_path(self, path: str) -> str:
         """Normalize path to reduce cardinality.
         
-        Replaces dynamic path segments with placeholders.
+        Replaces dynamic path segments with placeholders. A single
+        precompiled regex pass, cached per distinct path.
         """
-        parts = path.split("/")
-        normalized = []
-        
-        for part in parts:
-            # Replace UUIDs and numeric IDs with placeholder
-            if part and (self._is_uuid(part) or part.isdigit()):
-                normalized.append("{id}")
-            else:
-                normalized.append(part)
+        return _normalize_path(path)
+
+
+# Scrapes within this window share one generate_latest() (and one gzip)
+SCRAPE_CACHE_SECONDS = 1.0
+
+_scrape_lock = Lock()
+# [generated_at, payload, gzipped payload or None until first requested]
+_scrape_cache: Optional[list] = None
+
+
+def _scrape_payload(want_gzip: bool) -> bytes:
+    """Return the exposition payload, regenerated at most once per SCRAPE_CACHE_SECONDS."""
+    global _scrape_cache
+    now = time.monotonic()
+    with _scrape_lock:
+        if _scrape_cache is None or now - _scrape_cache[0] >= SCRAPE_CACHE_SECONDS:
+            flush_batched_counters()
+            _scrape_cache = [now, generate_latest(), None]
+        if not want_gzip:
+            return _scrape_cache[1]
+        if _scrape_cache[2] is None:
+            _scrape_cache[2] = gzip.compress(_scrape_cache[1], compresslevel=1)
+        return _scrape_cache[2]
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows a gzip response.
+    
+    A coding listed with q=0 is refused; an explicit gzip entry takes
+    precedence over "*". Unparsable q-values count as refusal, since an
+    uncompressed response is always acceptable.
+    """
+    gzip_q: Optional[float] = None
+    wildcard_q: Optional[float] = None
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
         
-        return "/".join(normalized)
+        coding = coding.strip().lower()
+        if coding in ("gzip", "x-gzip"):
+            gzip_q = q
+        elif coding == "*":
+            wildcard_q = q
+    
+    if gzip_q is not None:
+        return gzip_q > 0
+    return wildcard_q is not None and wildcard_q > 0
+
+
+def get_metrics(accept_encoding: str = "") -> StarletteResponse:
+    """Generate Prometheus metrics response.
     
-    def _is_uuid(self, value: str) -> bool:
-        """Check if value looks like a UUID."""
-        # Simple check for UUID-like strings
-        if len(value) == 36 and value.count("-") == 4:
-            return True
-        # Also match resource IDs that contain hyphens
-        if "-" in value and len(value) > 10:
-            return True
-        return False
-
-
-def get_metrics() -> StarletteResponse:
-    """Generate Prometheus metrics response."""
+    Args:
+        accept_encoding: The scraper's Accept-Encoding header; the payload
+            is gzip-compressed when it allows gzip
+    """
+    want_gzip = _accepts_gzip(accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if want_gzip:
+        headers["Content-Encoding"] = "gzip"
     return StarletteResponse(
-        content=generate_latest(),
+        content=_scrape_payload(want_gzip),
         media_type=CONTENT_TYPE_LATEST,
+        headers=headers,
     )
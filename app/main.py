@@ -1,12 +1,42 @@
 """Main FastAPI application entry point."""
 
+import json
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI, Request, Response
 
 from app.api.v1 import health, metrics, sla
 from app.core.config import settings
 from app.core.prometheus import PrometheusMiddleware, get_metrics
+from app.services.ingest_buffer import ingest_buffer
+
+
+def _available_cpus() -> int:
+    """Number of CPUs this process is allowed to run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        # sched_getaffinity is Linux-only
+        return os.cpu_count() or 1
+
+
+def _check_unique_routes(routers: tuple[APIRouter, ...]) -> None:
+    """Fail at startup if two routes share a method and path.
+    
+    The first registration would silently shadow the other.
+    
+    Raises:
+        RuntimeError: If a method/path pair is registered twice
+    """
+    seen: set[tuple[str, str]] = set()
+    for router in routers:
+        for route in router.routes:
+            for method in getattr(route, "methods", None) or ():
+                key = (method, route.path)
+                if key in seen:
+                    raise RuntimeError(f"Duplicate route: {method} {route.path}")
+                seen.add(key)
 
 
 @asynccontextmanager
@@ -16,9 +46,20 @@ async def lifespan(app: FastAPI):
     print(f"Starting {settings.app_name}")
     print(f"Environment: {settings.env}")
     print(f"Debug: {settings.debug}")
+    print(f"Workers: {settings.web_concurrency} (CPUs available: {_available_cpus()})")
+    if settings.web_concurrency > 1:
+        # Metric storage is per-process, so workers don't share history
+        print(
+            "WARNING: metric storage is in-memory per worker; with multiple workers "
+            "each resource's history is split across processes and anomaly/SLA "
+            "results will be computed on partial data"
+        )
+    if settings.ingest_buffered:
+        await ingest_buffer.start()
     yield
     # Shutdown
     print(f"Shutting down {settings.app_name}")
+    await ingest_buffer.stop()
 
 
 # Create FastAPI application
@@ -33,26 +74,31 @@ app = FastAPI(
 app.add_middleware(PrometheusMiddleware)
 
 # Mount API v1 routers
-app.include_router(health.router, prefix="/api/v1")
-app.include_router(metrics.router, prefix="/api/v1")
-app.include_router(sla.router, prefix="/api/v1")
+API_V1_ROUTERS = (health.router, metrics.router, sla.router)
+_check_unique_routes(API_V1_ROUTERS)
+for router in API_V1_ROUTERS:
+    app.include_router(router, prefix="/api/v1")
+
+
+# Root payload only depends on settings, so serialize it once at startup
+_ROOT_BODY = json.dumps({
+    "service": settings.app_name,
+    "docs": "/docs",
+    "health": "/api/v1/health",
+    "metrics": "/metrics",
+}).encode()
 
 
 @app.get("/", tags=["Root"])
-async def root():
+async def root() -> Response:
     """Root endpoint with API information."""
-    return {
-        "service": settings.app_name,
-        "docs": "/docs",
-        "health": "/api/v1/health",
-        "metrics": "/metrics",
-    }
+    return Response(content=_ROOT_BODY, media_type="application/json")
 
 
 @app.get("/metrics", tags=["Monitoring"], include_in_schema=False)
-async def prometheus_metrics():
+async def prometheus_metrics(request: Request):
     """Prometheus metrics endpoint."""
-    return get_metrics()
+    return get_metrics(request.headers.get("accept-encoding", ""))
 
 
 if __name__ == "__main__":
@@ -13,18 +13,24 @@ Z-score Behavior:
 """
 
 import math
+from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Optional
+from typing import Optional, Sequence
 
 from pydantic import BaseModel, Field
 
-from app.services.metric_service import MetricEntry, metric_service
+from app.services.metric_service import metric_service
 
 
 # Configuration
 DEFAULT_WINDOW_SIZE = 10
 DEFAULT_Z_THRESHOLD = 2.0
 ALGORITHM_VERSION = "zscore_v1"
+METRIC_NAMES = ("cpu_usage", "memory_usage", "gpu_usage")
+LOOKBACK_MINUTES = 60
+
+# Memoized results, cleared once this many are cached
+MAX_CACHED_RESULTS = 10000
 
 
 class AnomalyStatus(str, Enum):
@@ -45,14 +51,18 @@ class AnomalyResult(BaseModel):
     algorithm: str = ALGORITHM_VERSION
 
 
-def _calculate_mean(values: list[float]) -> float:
+# (resource_id, window_size, z_threshold) -> (metric version, expires_at, result)
+_result_cache: dict[tuple[str, int, float], tuple[int, Optional[datetime], AnomalyResult]] = {}
+
+
+def _calculate_mean(values: Sequence[float]) -> float:
     """Calculate arithmetic mean of values."""
     if not values:
         return 0.0
     return sum(values) / len(values)
 
 
-def _calculate_sample_std(values: list[float], mean: float) -> float:
+def _calculate_sample_std(values: Sequence[float], mean: float) -> float:
     """Calculate sample standard deviation using (n-1) denominator.
     
     Uses Bessel's correction for unbiased estimation of population
@@ -61,9 +71,13 @@ def _calculate_sample_std(values: list[float], mean: float) -> float:
     n = len(values)
     if n < 2:
         return 0.0
-    # Sample variance uses (n-1) denominator
-    variance = sum((x - mean) ** 2 for x in values) / (n - 1)
-    return math.sqrt(variance)
+    # A constant baseline has exactly zero spread; the mean's rounding
+    # residue would otherwise leave a tiny std (matches the rolling baseline)
+    if min(values) == max(values):
+        return 0.0
+    # sqrt(sum of squared deviations) computed in C by hypot, then scaled
+    # by the (n-1) denominator of the sample variance
+    return math.hypot(*map(mean.__rsub__, values)) / math.sqrt(n - 1)
 
 
 def _calculate_z_score(value: float, mean: float, std: float) -> float:
@@ -85,6 +99,33 @@ def _z_score_to_confidence(z_score: float, threshold: float) -> float:
     return round(confidence, 3)
 
 
+def insufficient_data_result(
+    resource_id: str,
+    available: int,
+    window_size: int,
+) -> AnomalyResult:
+    """Build the INSUFFICIENT_DATA result for a resource that can't fill the window.
+    
+    Args:
+        resource_id: The resource being analyzed
+        available: Number of metrics available for analysis
+        window_size: Requested rolling window size
+    """
+    if available == 0:
+        explanation = f"No metrics available for resource '{resource_id}'"
+    else:
+        explanation = f"Insufficient data: {available} metrics, need {window_size + 1}"
+    
+    # Results are built from internally computed values, so skip validation
+    return AnomalyResult.model_construct(
+        status=AnomalyStatus.INSUFFICIENT_DATA,
+        anomaly_detected=False,
+        anomaly_metrics=[],
+        explanation=explanation,
+        confidence_score=0.0,
+    )
+
+
 def detect_anomaly(
     resource_id: str,
     window_size: int = DEFAULT_WINDOW_SIZE,
@@ -100,6 +141,28 @@ def detect_anomaly(
     Returns:
         AnomalyResult with status, detection flag, and explanation
     
+    Raises:
+        ValueError: If resource_id is empty or parameters are invalid
+    """
+    result, _ = detect_anomaly_with_expiry(resource_id, window_size, z_threshold)
+    return result
+
+
+def detect_anomaly_with_expiry(
+    resource_id: str,
+    window_size: int = DEFAULT_WINDOW_SIZE,
+    z_threshold: float = DEFAULT_Z_THRESHOLD,
+) -> tuple[AnomalyResult, Optional[datetime]]:
+    """detect_anomaly, memoized until the resource's metrics change.
+    
+    A cached result is reused while no metric has been added to the
+    resource and none of the metrics it was computed from has aged out of
+    the lookback.
+    
+    Returns:
+        The AnomalyResult, and the time after which it expires even without
+        new metrics (None if it only changes when metrics are added)
+    
     Raises:
         ValueError: If resource_id is empty or parameters are invalid
     """
@@ -110,86 +173,98 @@ def detect_anomaly(
     if z_threshold <= 0:
         raise ValueError("z_threshold must be positive")
     
-    # Get all historical metrics
-    all_metrics = metric_service.get_metrics_last_n_minutes(resource_id, minutes=60)
-    
-    if not all_metrics:
-        return AnomalyResult(
-            status=AnomalyStatus.INSUFFICIENT_DATA,
-            anomaly_detected=False,
-            anomaly_metrics=[],
-            explanation=f"No metrics available for resource '{resource_id}'",
-            confidence_score=0.0,
-        )
+    key = (resource_id, window_size, z_threshold)
+    version = metric_service.version(resource_id)
+    cached = _result_cache.get(key)
+    if cached is not None and cached[0] == version:
+        expires_at = cached[1]
+        if expires_at is None or datetime.now(timezone.utc) <= expires_at:
+            return cached[2], expires_at
     
-    # Need at least window_size + 1 entries (window + 1 to analyze)
-    if len(all_metrics) < window_size + 1:
-        return AnomalyResult(
-            status=AnomalyStatus.INSUFFICIENT_DATA,
-            anomaly_detected=False,
-            anomaly_metrics=[],
-            explanation=f"Insufficient data: {len(all_metrics)} metrics, need {window_size + 1}",
-            confidence_score=0.0,
-        )
+    result, expires_at = _detect(resource_id, window_size, z_threshold)
+    if len(_result_cache) >= MAX_CACHED_RESULTS:
+        _result_cache.clear()
+    _result_cache[key] = (version, expires_at, result)
+    return result, expires_at
+
+
+def _detect(
+    resource_id: str,
+    window_size: int,
+    z_threshold: float,
+) -> tuple[AnomalyResult, Optional[datetime]]:
+    """Run the Z-score analysis; see detect_anomaly_with_expiry for the return value."""
+    lookback = timedelta(minutes=LOOKBACK_MINUTES)
     
-    # Latest metric is the one we're analyzing
-    latest = all_metrics[-1]
+    # (metric_name, current_value, mean, std) per metric type
+    stats: list[tuple[str, float, float, float]]
     
-    # Window slicing: use previous N metrics, excluding latest
-    # This avoids data leakage - we don't include the value we're testing
-    # in the baseline statistics
-    window = all_metrics[-(window_size + 1):-1]
+    # Default window: statistics are maintained incrementally by the store
+    baseline = metric_service.get_baseline(
+        resource_id, minutes=LOOKBACK_MINUTES, window_size=window_size
+    )
+    if baseline is not None:
+        stats = list(zip(METRIC_NAMES, baseline.latest, baseline.means, baseline.stds))
+        # The result changes once the oldest window metric leaves the lookback
+        expires_at = baseline.since + lookback
+    else:
+        # Get the most recent hour of history, only as much as the window needs
+        recent = metric_service.get_window(
+            resource_id, minutes=LOOKBACK_MINUTES, limit=window_size + 1
+        )
+        expires_at = recent.timestamps[0] + lookback if recent else None
+        
+        # Need at least window_size + 1 entries (window + 1 to analyze)
+        if len(recent) < window_size + 1:
+            return insufficient_data_result(resource_id, len(recent), window_size), expires_at
+        
+        stats = []
+        for metric_name in METRIC_NAMES:
+            column = getattr(recent, metric_name)
+            
+            # Window slicing: use previous N values, excluding latest
+            # This avoids data leakage - we don't include the value we're testing
+            # in the baseline statistics
+            values = column[:-1]
+            mean = _calculate_mean(values)
+            
+            # Latest value is the one we're analyzing
+            stats.append((metric_name, column[-1], mean, _calculate_sample_std(values, mean)))
     
     # Analyze each metric type
     anomalies: list[str] = []
-    z_scores: dict[str, float] = {}
-    details: dict[str, dict] = {}
+    anomaly_details: list[str] = []
+    max_z = 0.0
     
-    for metric_name in ["cpu_usage", "memory_usage", "gpu_usage"]:
-        values = [getattr(m, metric_name) for m in window]
-        current_value = getattr(latest, metric_name)
-        
-        mean = _calculate_mean(values)
-        std = _calculate_sample_std(values, mean)
+    for metric_name, current_value, mean, std in stats:
         z_score = _calculate_z_score(current_value, mean, std)
-        
-        z_scores[metric_name] = z_score
-        details[metric_name] = {
-            "current": current_value,
-            "mean": round(mean, 2),
-            "std": round(std, 2),
-            "z_score": round(z_score, 2),
-        }
+        if z_score > max_z:
+            max_z = z_score
         
         if z_score > z_threshold:
             anomalies.append(metric_name)
+            # Details are only formatted for metrics the explanation names
+            anomaly_details.append(
+                f"{metric_name}={current_value} (mean={round(mean, 2)}, "
+                f"std={round(std, 2)}, z={round(z_score, 2)})"
+            )
     
-    # Determine status and confidence
+    # Determine status, confidence and explanation. Any anomalous z-score
+    # exceeds every normal one, so max_z is the largest anomalous z-score
     if anomalies:
         status = AnomalyStatus.ANOMALY
-        max_z = max(z_scores[m] for m in anomalies)
         confidence = _z_score_to_confidence(max_z, z_threshold)
+        explanation = f"Anomaly detected: {'; '.join(anomaly_details)}. Threshold: {z_threshold}"
     else:
         status = AnomalyStatus.OK
         confidence = 0.0
-    
-    # Build explanation
-    if anomalies:
-        anomaly_details = []
-        for m in anomalies:
-            d = details[m]
-            anomaly_details.append(
-                f"{m}={d['current']} (mean={d['mean']}, std={d['std']}, z={d['z_score']})"
-            )
-        explanation = f"Anomaly detected: {'; '.join(anomaly_details)}. Threshold: {z_threshold}"
-    else:
-        max_z = max(z_scores.values()) if z_scores else 0
         explanation = f"All metrics normal. Max z-score: {max_z:.2f}, threshold: {z_threshold}"
     
-    return AnomalyResult(
+    result = AnomalyResult.model_construct(
         status=status,
-        anomaly_detected=len(anomalies) > 0,
+        anomaly_detected=bool(anomalies),
         anomaly_metrics=anomalies,
         explanation=explanation,
         confidence_score=confidence,
     )
+    return result, expires_at
@@ -0,0 +1,127 @@
+"""Buffered metric ingestion.
+
+Single-metric ingests are queued in memory and written to the metric store
+in batches by a background task, so the request path is O(enqueue) and the
+store lock and Prometheus counter are touched once per batch.
+
+Behavior Notes:
+- Buffered metrics become visible to readers after the next flush
+  (at most one flush interval)
+- When the flusher isn't running or the queue is full, metrics are
+  written synchronously so nothing is dropped
+- Pending metrics are flushed on shutdown
+"""
+
+import asyncio
+from typing import Optional
+
+from app.core.config import settings
+from app.core.prometheus import INGEST_QUEUE_DEPTH, METRICS_INGESTED
+from app.services.metric_service import MetricEntry, metric_service
+
+# Queue capacity, in batches, before ingestion falls back to synchronous writes
+MAX_PENDING_BATCHES = 20
+
+
+class IngestBuffer:
+    """Queue that batches metric writes into the metric store."""
+    
+    def __init__(self, batch_max: int, flush_interval: float):
+        self._batch_max = batch_max
+        self._flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def depth(self) -> int:
+        """Number of metrics waiting to be flushed."""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    async def start(self) -> None:
+        """Start the background flush task."""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self._batch_max * MAX_PENDING_BATCHES)
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        """Stop the flush task and write out any pending metrics.
+        
+        The batch being collected is flushed by the task itself when it is
+        cancelled; metrics still in the queue are flushed here.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            self._flush(pending)
+        
+        self._task = None
+        self._queue = None
+    
+    def enqueue(self, metric: MetricEntry) -> None:
+        """Queue a metric for the next flush.
+        
+        Raises:
+            ValueError: If resource_id is empty
+        """
+        if not metric.resource_id or not metric.resource_id.strip():
+            raise ValueError("resource_id must be non-empty")
+        
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(metric)
+                return
+            except asyncio.QueueFull:
+                pass
+        
+        # Flusher not running or saturated: write through
+        self._flush([metric])
+    
+    async def _run(self) -> None:
+        """Drain the queue in batches of up to batch_max or one flush interval."""
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self._flush_interval
+            
+            try:
+                while len(batch) < self._batch_max:
+                    if not queue.empty():
+                        batch.append(queue.get_nowait())
+                        continue
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            finally:
+                # Also runs when stop() cancels the task mid-batch, so
+                # metrics already taken off the queue aren't lost
+                self._flush(batch)
+    
+    def _flush(self, batch: list[MetricEntry]) -> None:
+        """Write a batch to the store and record it."""
+        metric_service.add_metrics(batch)
+        METRICS_INGESTED.inc(len(batch))
+
+
+# Singleton instance
+ingest_buffer = IngestBuffer(
+    batch_max=settings.ingest_batch_max,
+    flush_interval=settings.ingest_flush_ms / 1000,
+)
+
+INGEST_QUEUE_DEPTH.set_function(lambda: ingest_buffer.depth)
@@ -4,91 +4,266 @@ Behavior Notes:
 - Duplicate timestamps are allowed and stored in insertion order
 - Metrics are stored per resource_id with a maximum retention limit
 - Timestamps are normalized to timezone-aware UTC
+- Each resource is stored column-wise, so analysis reads contiguous value
+  columns instead of walking entry objects. Metric values are kept in
+  array("d") columns: 8 bytes per value instead of a pointer plus a
+  boxed float
+- Mean/variance of the default anomaly baseline window are maintained
+  incrementally on ingest (see get_baseline)
+- Each resource has its own lock, so reads and writes for different
+  resources never wait on each other
 """
 
+import math
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from threading import Lock
 from typing import Optional
 
-from pydantic import BaseModel, field_validator
-
 # Configuration
 MAX_ENTRIES_PER_RESOURCE = 10000
 
+# Baseline window with incrementally maintained statistics
+# (matches anomaly_service.DEFAULT_WINDOW_SIZE)
+ROLLING_WINDOW_SIZE = 10
+
+# Evicted entries are deleted from the columns in batches of this many,
+# so a full series doesn't shift every column on each insert
+RETENTION_TRIM_BATCH = 1000
+
+# Rolling statistics are rebuilt exactly once M2 falls this far below its
+# peak since the last rebuild: the sliding update's rounding error scales
+# with the peak, so it would otherwise dominate a much smaller variance
+ROLLING_DRIFT_RATIO = 1e6
 
-def _find_insertion_index(entries: list, timestamp: datetime) -> int:
-    """Binary search to find insertion index for a timestamp.
+# Shared tzinfo: aware datetimes with the same tzinfo object compare
+# without calling utcoffset(), which keeps binary searches fast
+_UTC = timezone.utc
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class MetricEntry:
+    """Single metric entry.
     
-    Returns the index where the entry should be inserted to maintain
-    chronological order. For duplicate timestamps, returns the position
-    after existing entries with the same timestamp.
+    A slotted dataclass rather than a Pydantic model: entries are built from
+    already-validated API input, so they skip per-field validation and carry
+    no per-instance __dict__. Timestamps are normalized to UTC when the
+    store ingests an entry, not on construction, so entries rebuilt from
+    stored columns pay nothing.
+    """
     
-    Args:
-        entries: List of MetricEntry objects sorted by timestamp
-        timestamp: The timestamp to find insertion position for
+    resource_id: str
+    cpu_usage: float
+    memory_usage: float
+    gpu_usage: float
+    timestamp: datetime
+
+
+def _normalize_to_utc(v: datetime) -> datetime:
+    """Normalize timestamp to timezone-aware UTC."""
+    if v.tzinfo is _UTC:
+        # Already normalized
+        return v
+    if v.tzinfo is None:
+        # Naive datetime - assume UTC
+        return v.replace(tzinfo=_UTC)
+    # Convert to UTC
+    return v.astimezone(_UTC)
+
+
+@dataclass(slots=True)
+class MetricWindow:
+    """Column-oriented snapshot of consecutive metrics for one resource.
     
-    Returns:
-        Index where new entry should be inserted
+    Columns are index-aligned and ordered oldest to newest.
     """
-    left = 0
-    right = len(entries)
     
-    while left < right:
-        mid = (left + right) // 2
-        if entries[mid].timestamp <= timestamp:
-            left = mid + 1
-        else:
-            right = mid
+    timestamps: list[datetime]
+    cpu_usage: array
+    memory_usage: array
+    gpu_usage: array
     
-    return left
+    def __len__(self) -> int:
+        return len(self.timestamps)
 
 
-def _find_cutoff_index(entries: list, cutoff: datetime) -> int:
-    """Binary search to find first entry at or after cutoff timestamp.
+@dataclass(slots=True, frozen=True)
+class WindowBaseline:
+    """Statistics of the window preceding a resource's latest metric.
+    
+    Tuples are ordered cpu_usage, memory_usage, gpu_usage.
+    """
     
-    Args:
-        entries: List of MetricEntry objects sorted by timestamp
-        cutoff: The minimum timestamp to include
+    latest: tuple[float, float, float]
+    means: tuple[float, float, float]
+    stds: tuple[float, float, float]
+    # Timestamp of the oldest metric in the window
+    since: datetime
+
+
+class _RollingStats:
+    """Welford mean/M2 over a sliding window of one metric column.
     
-    Returns:
-        Index of first entry with timestamp >= cutoff
+    `run` counts identical trailing values, so a constant window reports
+    exactly zero variance instead of accumulated rounding error. `peak`
+    tracks the largest M2 since construction, see ROLLING_DRIFT_RATIO.
     """
-    left = 0
-    right = len(entries)
     
-    while left < right:
-        mid = (left + right) // 2
-        if entries[mid].timestamp < cutoff:
-            left = mid + 1
+    __slots__ = ("n", "mean", "m2", "last", "run", "peak")
+    
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last: Optional[float] = None
+        self.run = 0
+        self.peak = 0.0
+    
+    def push(self, value: float, leaving: Optional[float] = None) -> None:
+        """Add value to the window, replacing `leaving` once the window is full."""
+        if leaving is None:
+            self.n += 1
+            delta = value - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (value - self.mean)
         else:
-            right = mid
+            delta = value - leaving
+            old_mean = self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (value - self.mean + leaving - old_mean)
+        
+        self.run = self.run + 1 if value == self.last else 1
+        self.last = value
+        if self.m2 > self.peak:
+            self.peak = self.m2
     
-    return left
+    @property
+    def drifted(self) -> bool:
+        """Whether accumulated rounding error may be significant."""
+        return self.m2 * ROLLING_DRIFT_RATIO < self.peak
+    
+    def mean_std(self) -> tuple[float, float]:
+        """Window mean and sample standard deviation."""
+        if self.run >= self.n:
+            return self.last, 0.0
+        return self.mean, math.sqrt(max(self.m2, 0.0) / (self.n - 1))
 
 
-class MetricEntry(BaseModel):
-    """Single metric entry with UTC timestamp validation."""
+class _Series:
+    """Per-resource metric columns, kept sorted by timestamp.
     
-    resource_id: str
-    cpu_usage: float
-    memory_usage: float
-    gpu_usage: float
-    timestamp: datetime
+    Entries before index `start` have been evicted by retention and are
+    only physically deleted once RETENTION_TRIM_BATCH accumulate; all
+    reads and searches cover columns[start:].
+    """
+    
+    __slots__ = ("lock", "timestamps", "cpu_usage", "memory_usage", "gpu_usage", "start", "stats", "version")
+    
+    def __init__(self):
+        # Guards every field below; the columns are mutated in place
+        self.lock = Lock()
+        # Incremented on every insert
+        self.version = 0
+        self.start = 0
+        self.timestamps: list[datetime] = []
+        self.cpu_usage = array("d")
+        self.memory_usage = array("d")
+        self.gpu_usage = array("d")
+        # Rolling statistics of the ROLLING_WINDOW_SIZE values preceding the
+        # latest one, per metric; None when they must be rebuilt
+        self.stats: Optional[tuple[_RollingStats, ...]] = self._new_stats()
+    
+    @staticmethod
+    def _new_stats() -> tuple[_RollingStats, ...]:
+        return (_RollingStats(), _RollingStats(), _RollingStats())
+    
+    def _columns(self) -> tuple[array, ...]:
+        return (self.cpu_usage, self.memory_usage, self.gpu_usage)
     
-    @field_validator("timestamp")
-    @classmethod
-    def normalize_to_utc(cls, v: datetime) -> datetime:
-        """Normalize timestamp to timezone-aware UTC."""
-        if v.tzinfo is None:
-            # Naive datetime - assume UTC
-            return v.replace(tzinfo=timezone.utc)
-        # Convert to UTC
-        return v.astimezone(timezone.utc)
+    def __len__(self) -> int:
+        return len(self.timestamps) - self.start
+    
+    def insert(self, metric: MetricEntry) -> None:
+        """Insert a metric in chronological order."""
+        self.version += 1
+        timestamps = self.timestamps
+        timestamp = _normalize_to_utc(metric.timestamp)
+        
+        # Optimized insertion: append if chronological, binary search if out-of-order
+        if not timestamps or timestamp >= timestamps[-1]:
+            timestamps.append(timestamp)
+            self.cpu_usage.append(metric.cpu_usage)
+            self.memory_usage.append(metric.memory_usage)
+            self.gpu_usage.append(metric.gpu_usage)
+            
+            # The previous latest value enters the baseline window and, once
+            # the window is full, its oldest value leaves
+            size = len(self)
+            if self.stats is not None and size >= 2:
+                full = size >= ROLLING_WINDOW_SIZE + 2
+                drifted = False
+                for stats, column in zip(self.stats, self._columns()):
+                    stats.push(column[-2], column[-(ROLLING_WINDOW_SIZE + 2)] if full else None)
+                    drifted = drifted or stats.drifted
+                if drifted:
+                    # Rebuilt exactly on the next read
+                    self.stats = None
+        else:
+            # Out-of-order: binary search for the insertion position, after
+            # any entries with the same timestamp
+            pos = bisect_right(timestamps, timestamp, lo=self.start)
+            timestamps.insert(pos, timestamp)
+            self.cpu_usage.insert(pos, metric.cpu_usage)
+            self.memory_usage.insert(pos, metric.memory_usage)
+            self.gpu_usage.insert(pos, metric.gpu_usage)
+            self.stats = None
+    
+    def rolling_stats(self) -> tuple[_RollingStats, ...]:
+        """Rolling statistics, rebuilt from the columns if invalidated."""
+        if self.stats is None:
+            stats = self._new_stats()
+            for rolling, column in zip(stats, self._columns()):
+                for value in column[-(ROLLING_WINDOW_SIZE + 1):-1]:
+                    rolling.push(value)
+            self.stats = stats
+        return self.stats
+    
+    def trim(self, max_entries: int) -> None:
+        """Evict the oldest entries beyond max_entries."""
+        excess = len(self) - max_entries
+        if excess > 0:
+            self.start += excess
+            if self.start >= RETENTION_TRIM_BATCH:
+                evicted = self.start
+                del self.timestamps[:evicted]
+                del self.cpu_usage[:evicted]
+                del self.memory_usage[:evicted]
+                del self.gpu_usage[:evicted]
+                self.start = 0
+    
+    def cutoff_index(self, cutoff: datetime) -> int:
+        """Column index of the first retained entry at or after cutoff."""
+        return bisect_left(self.timestamps, cutoff, lo=self.start)
+    
+    def window(self, start: int) -> MetricWindow:
+        """Copy the columns from column index start onward."""
+        return MetricWindow(
+            timestamps=self.timestamps[start:],
+            cpu_usage=self.cpu_usage[start:],
+            memory_usage=self.memory_usage[start:],
+            gpu_usage=self.gpu_usage[start:],
+        )
 
 
 class MetricService:
     """Thread-safe in-memory time-series metric store.
     
+    Series are never removed from the store once created, so a dict lookup
+    needs no lock; the service-wide lock only serializes series creation,
+    and each series' own lock guards its columns.
+    
     Features:
     - Optimized insertion (append for chronological, binary search for out-of-order)
     - Retention policy limiting entries per resource
@@ -97,7 +272,7 @@ class MetricService:
     """
     
     def __init__(self):
-        self._store: dict[str, list[MetricEntry]] = {}
+        self._store: dict[str, _Series] = {}
         self._lock = Lock()
     
     def add_metric(self, metric: MetricEntry) -> None:
@@ -112,23 +287,80 @@ class MetricService:
         if not metric.resource_id or not metric.resource_id.strip():
             raise ValueError("resource_id must be non-empty")
         
-        with self._lock:
-            if metric.resource_id not in self._store:
-                self._store[metric.resource_id] = []
-            
-            entries = self._store[metric.resource_id]
-            
-            # Optimized insertion: append if chronological, binary search if out-of-order
-            if not entries or metric.timestamp >= entries[-1].timestamp:
-                entries.append(metric)
-            else:
-                # Out-of-order: use binary search to find insertion position
-                pos = _find_insertion_index(entries, metric.timestamp)
-                entries.insert(pos, metric)
-            
-            # Enforce retention policy: keep only most recent entries
-            if len(entries) > MAX_ENTRIES_PER_RESOURCE:
-                self._store[metric.resource_id] = entries[-MAX_ENTRIES_PER_RESOURCE:]
+        series = self._series_for_write(metric.resource_id)
+        with series.lock:
+            series.insert(metric)
+            series.trim(MAX_ENTRIES_PER_RESOURCE)
+    
+    def add_metrics(self, metrics: list[MetricEntry]) -> None:
+        """Add a batch of metric entries to the store.
+        
+        Each resource's entries are inserted under a single acquisition of
+        its lock, and retention is enforced once per resource instead of
+        once per entry.
+        The batch is validated up front, so an invalid entry leaves the
+        store untouched.
+        
+        Raises:
+            ValueError: If any resource_id is empty
+        """
+        for metric in metrics:
+            if not metric.resource_id or not metric.resource_id.strip():
+                raise ValueError("resource_id must be non-empty")
+        
+        # Stable sort keeps insertion order for duplicate timestamps and
+        # turns most inserts into the O(1) append path
+        ordered = sorted(metrics, key=lambda m: _normalize_to_utc(m.timestamp))
+        
+        by_resource: dict[str, list[MetricEntry]] = {}
+        for metric in ordered:
+            by_resource.setdefault(metric.resource_id, []).append(metric)
+        
+        for resource_id, entries in by_resource.items():
+            series = self._series_for_write(resource_id)
+            with series.lock:
+                for metric in entries:
+                    series.insert(metric)
+                series.trim(MAX_ENTRIES_PER_RESOURCE)
+    
+    def _series_for_write(self, resource_id: str) -> _Series:
+        """Get the series for a resource, creating it if needed."""
+        series = self._store.get(resource_id)
+        if series is None:
+            with self._lock:
+                series = self._store.setdefault(resource_id, _Series())
+        return series
+    
+    def count(self, resource_id: str) -> int:
+        """Get the number of stored metrics for a resource in O(1).
+        
+        Raises:
+            ValueError: If resource_id is empty
+        """
+        if not resource_id or not resource_id.strip():
+            raise ValueError("resource_id must be non-empty")
+        
+        series = self._store.get(resource_id)
+        if series is None:
+            return 0
+        with series.lock:
+            return len(series)
+    
+    def version(self, resource_id: str) -> int:
+        """Get a counter that changes whenever a resource's metrics change.
+        
+        Lets callers memoize results derived from a resource's metrics.
+        Returns 0 for unknown resources.
+        
+        Raises:
+            ValueError: If resource_id is empty
+        """
+        if not resource_id or not resource_id.strip():
+            raise ValueError("resource_id must be non-empty")
+        
+        series = self._store.get(resource_id)
+        # A single attribute read, atomic without the lock
+        return series.version if series is not None else 0
     
     def get_latest_metric(self, resource_id: str) -> Optional[MetricEntry]:
         """Get the most recent metric for a resource.
@@ -139,11 +371,19 @@ class MetricService:
         if not resource_id or not resource_id.strip():
             raise ValueError("resource_id must be non-empty")
         
-        with self._lock:
-            entries = self._store.get(resource_id, [])
-            if not entries:
+        series = self._store.get(resource_id)
+        if series is None:
+            return None
+        with series.lock:
+            if not series:
                 return None
-            return entries[-1]
+            return MetricEntry(
+                resource_id=resource_id,
+                cpu_usage=series.cpu_usage[-1],
+                memory_usage=series.memory_usage[-1],
+                gpu_usage=series.gpu_usage[-1],
+                timestamp=series.timestamps[-1],
+            )
     
     def get_metrics_last_n_minutes(
         self, 
@@ -152,6 +392,39 @@ class MetricService:
     ) -> list[MetricEntry]:
         """Get all metrics from the last N minutes for a resource.
         
+        Raises:
+            ValueError: If resource_id is empty or minutes <= 0
+        """
+        window = self.get_window(resource_id, minutes)
+        return [
+            MetricEntry(
+                resource_id=resource_id,
+                cpu_usage=cpu,
+                memory_usage=memory,
+                gpu_usage=gpu,
+                timestamp=timestamp,
+            )
+            for timestamp, cpu, memory, gpu in zip(
+                window.timestamps, window.cpu_usage, window.memory_usage, window.gpu_usage
+            )
+        ]
+    
+    def get_baseline(
+        self,
+        resource_id: str,
+        minutes: int,
+        window_size: int,
+    ) -> Optional[WindowBaseline]:
+        """Get precomputed statistics of the window before the latest metric.
+        
+        Serves the same baseline as get_window(resource_id, minutes,
+        limit=window_size + 1) without copying or rescanning the window.
+        
+        Returns:
+            The baseline, or None if it can't be served from rolling
+            statistics (window_size other than ROLLING_WINDOW_SIZE, or
+            fewer than window_size + 1 metrics in the last N minutes)
+        
         Raises:
             ValueError: If resource_id is empty or minutes <= 0
         """
@@ -159,18 +432,64 @@ class MetricService:
             raise ValueError("resource_id must be non-empty")
         if minutes <= 0:
             raise ValueError("minutes must be greater than 0")
+        if window_size != ROLLING_WINDOW_SIZE:
+            return None
         
-        with self._lock:
-            entries = self._store.get(resource_id, [])
-            if not entries:
-                return []
+        series = self._store.get(resource_id)
+        if series is None:
+            return None
+        with series.lock:
+            if len(series) < window_size + 1:
+                return None
+            
+            cutoff = datetime.now(_UTC) - timedelta(minutes=minutes)
+            if series.timestamps[-(window_size + 1)] < cutoff:
+                return None
             
-            cutoff = datetime.now(timezone.utc) - timedelta(minutes=minutes)
+            means, stds = zip(*(stats.mean_std() for stats in series.rolling_stats()))
+            return WindowBaseline(
+                latest=(series.cpu_usage[-1], series.memory_usage[-1], series.gpu_usage[-1]),
+                means=means,
+                stds=stds,
+                since=series.timestamps[-(window_size + 1)],
+            )
+    
+    def get_window(
+        self,
+        resource_id: str,
+        minutes: int,
+        limit: Optional[int] = None,
+    ) -> MetricWindow:
+        """Get metrics from the last N minutes for a resource as columns.
+        
+        Args:
+            resource_id: The resource to read
+            minutes: Lookback period
+            limit: If set, return at most this many of the most recent metrics
+        
+        Raises:
+            ValueError: If resource_id is empty, minutes <= 0 or limit < 1
+        """
+        if not resource_id or not resource_id.strip():
+            raise ValueError("resource_id must be non-empty")
+        if minutes <= 0:
+            raise ValueError("minutes must be greater than 0")
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be at least 1")
+        
+        series = self._store.get(resource_id)
+        if series is None:
+            return MetricWindow([], array("d"), array("d"), array("d"))
+        
+        with series.lock:
+            cutoff = datetime.now(_UTC) - timedelta(minutes=minutes)
             
             # Use binary search to find start position efficiently
-            start_idx = _find_cutoff_index(entries, cutoff)
+            start_idx = series.cutoff_index(cutoff)
+            if limit is not None:
+                start_idx = max(start_idx, len(series.timestamps) - limit)
             
-            return entries[start_idx:]
+            return series.window(start_idx)
 
 
 # Singleton instance
@@ -11,12 +11,14 @@ Risk scoring is deterministic and explainable.
 No persistence or ML models used.
 """
 
+from datetime import datetime, timedelta, timezone
 from enum import Enum
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
-from app.services.anomaly_service import detect_anomaly, AnomalyStatus
-from app.services.metric_service import metric_service
+from app.services.anomaly_service import AnomalyStatus, detect_anomaly_with_expiry
+from app.services.metric_service import MetricWindow, metric_service
 
 
 # SLA Thresholds (configurable)
@@ -28,6 +30,9 @@ DEFAULT_GPU_THRESHOLD = 90.0
 RISK_LOW_THRESHOLD = 0.3
 RISK_HIGH_THRESHOLD = 0.6
 
+# Memoized results, cleared once this many are cached
+MAX_CACHED_RESULTS = 10000
+
 
 class RiskStatus(str, Enum):
     """Status of risk assessment."""
@@ -65,30 +70,35 @@ class SLARiskResult(BaseModel):
     explanation: str
 
 
+# (resource_id, lookback_minutes, thresholds...) -> (metric version, expires_at, result)
+_result_cache: dict[tuple, tuple[int, Optional[datetime], SLARiskResult]] = {}
+
+
 def _calculate_threshold_breach_rate(
-    metrics: list,
+    window: MetricWindow,
     cpu_threshold: float,
     memory_threshold: float,
     gpu_threshold: float,
 ) -> tuple[float, dict]:
     """Calculate percentage of metrics exceeding thresholds."""
-    if not metrics:
+    samples = len(window)
+    if not samples:
         return 0.0, {"samples_checked": 0}
     
-    cpu_breaches = sum(1 for m in metrics if m.cpu_usage > cpu_threshold)
-    memory_breaches = sum(1 for m in metrics if m.memory_usage > memory_threshold)
-    gpu_breaches = sum(1 for m in metrics if m.gpu_usage > gpu_threshold)
+    cpu_breaches = sum(1 for v in window.cpu_usage if v > cpu_threshold)
+    memory_breaches = sum(1 for v in window.memory_usage if v > memory_threshold)
+    gpu_breaches = sum(1 for v in window.gpu_usage if v > gpu_threshold)
     
-    total_checks = len(metrics) * 3
+    total_checks = samples * 3
     total_breaches = cpu_breaches + memory_breaches + gpu_breaches
     
     breach_rate = total_breaches / total_checks if total_checks > 0 else 0.0
     
     details = {
-        "cpu_breach_pct": round(cpu_breaches / len(metrics) * 100, 1),
-        "memory_breach_pct": round(memory_breaches / len(metrics) * 100, 1),
-        "gpu_breach_pct": round(gpu_breaches / len(metrics) * 100, 1),
-        "samples_checked": len(metrics),
+        "cpu_breach_pct": round(cpu_breaches / samples * 100, 1),
+        "memory_breach_pct": round(memory_breaches / samples * 100, 1),
+        "gpu_breach_pct": round(gpu_breaches / samples * 100, 1),
+        "samples_checked": samples,
     }
     
     return breach_rate, details
@@ -123,26 +133,59 @@ def compute_sla_risk(
     if lookback_minutes <= 0:
         raise ValueError("lookback_minutes must be positive")
     
+    # Memoized until the resource's metrics change or an input metric
+    # ages out of the lookback
+    key = (resource_id, lookback_minutes, cpu_threshold, memory_threshold, gpu_threshold)
+    version = metric_service.version(resource_id)
+    cached = _result_cache.get(key)
+    if cached is not None and cached[0] == version:
+        expires_at = cached[1]
+        if expires_at is None or datetime.now(timezone.utc) <= expires_at:
+            return cached[2]
+    
+    result, expires_at = _compute_sla_risk(
+        resource_id, lookback_minutes, cpu_threshold, memory_threshold, gpu_threshold
+    )
+    if len(_result_cache) >= MAX_CACHED_RESULTS:
+        _result_cache.clear()
+    _result_cache[key] = (version, expires_at, result)
+    return result
+
+
+def _compute_sla_risk(
+    resource_id: str,
+    lookback_minutes: int,
+    cpu_threshold: float,
+    memory_threshold: float,
+    gpu_threshold: float,
+) -> tuple[SLARiskResult, Optional[datetime]]:
+    """Compute the risk result and the time it expires without new metrics."""
     # Get metrics for analysis
-    metrics = metric_service.get_metrics_last_n_minutes(resource_id, lookback_minutes)
+    window = metric_service.get_window(resource_id, lookback_minutes)
     
     # Check for sufficient data
-    if not metrics:
-        return SLARiskResult(
+    if not window:
+        # Results are built from internally computed values, so skip validation
+        return SLARiskResult.model_construct(
             status=RiskStatus.INSUFFICIENT_DATA,
             resource_id=resource_id,
             risk_score=0.0,
             risk_level=RiskLevel.LOW,
             signals=[],
             explanation=f"No metrics available for resource '{resource_id}'",
-        )
+        ), None
+    
+    # The result changes once the oldest metric leaves the lookback
+    expires_at = window.timestamps[0] + timedelta(minutes=lookback_minutes)
     
     signals: list[RiskSignal] = []
     
     # Signal 1: Anomaly presence (40% weight)
     # INSUFFICIENT_DATA from anomaly detection is treated as non-anomalous
     anomaly_weight = 0.4
-    anomaly_result = detect_anomaly(resource_id)
+    anomaly_result, anomaly_expires_at = detect_anomaly_with_expiry(resource_id)
+    if anomaly_expires_at is not None:
+        expires_at = min(expires_at, anomaly_expires_at)
     
     if anomaly_result.status == AnomalyStatus.ANOMALY:
         anomaly_score = anomaly_result.confidence_score
@@ -151,7 +194,7 @@ def compute_sla_risk(
         anomaly_score = 0.0
     
     anomaly_contribution = anomaly_score * anomaly_weight
-    signals.append(RiskSignal(
+    signals.append(RiskSignal.model_construct(
         name="anomaly_presence",
         value=round(anomaly_score, 3),
         weight=anomaly_weight,
@@ -161,11 +204,11 @@ def compute_sla_risk(
     # Signal 2: Threshold breach rate (60% weight)
     breach_weight = 0.6
     breach_rate, breach_details = _calculate_threshold_breach_rate(
-        metrics, cpu_threshold, memory_threshold, gpu_threshold
+        window, cpu_threshold, memory_threshold, gpu_threshold
     )
     
     breach_contribution = breach_rate * breach_weight
-    signals.append(RiskSignal(
+    signals.append(RiskSignal.model_construct(
         name="threshold_breach_rate",
         value=round(breach_rate, 3),
         weight=breach_weight,
@@ -207,7 +250,7 @@ def compute_sla_risk(
     
     explanation = f"Predictive risk {risk_level.value} ({risk_score:.0%}). " + "; ".join(explanation_parts)
     
-    return SLARiskResult(
+    result = SLARiskResult.model_construct(
         status=RiskStatus.OK,
         resource_id=resource_id,
         risk_score=risk_score,
@@ -215,3 +258,4 @@ def compute_sla_risk(
         signals=signals,
         explanation=explanation,
     )
+    return result, expires_at
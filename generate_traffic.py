@@ -1,43 +1,58 @@
 import time
 import random
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from itertools import cycle, islice
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:8000/api/v1"
+CYCLES = 200
+WORKERS = 20
+
+def _send(session, method, url, **kwargs):
+    try:
+        session.request(method, url, **kwargs)
+    except:
+        pass
+
+def _one_cycle(resource, session):
+    # 1. Health check (success)
+    _send(session, "GET", f"{BASE_URL}/health")
+    
+    # 2. Ingest metrics
+    data = {
+        "resource_id": resource,
+        "cpu_usage": random.uniform(20, 95),
+        "memory_usage": random.uniform(30, 90),
+        "gpu_usage": random.uniform(0, 50),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    _send(session, "POST", f"{BASE_URL}/metrics/ingest", json=data)
+    
+    # 3. Check SLA Risk
+    _send(session, "GET", f"{BASE_URL}/sla/{resource}/risk")
+    
+    # Small jitter so workers don't fire in lockstep
+    time.sleep(random.uniform(0, 0.05))
 
 def generate_traffic():
     resources = ["server-001", "server-002", "db-01"]
     
-    print("Generating traffic...")
-    for _ in range(20):
-        # 1. Health check (success)
-        try:
-            requests.get(f"{BASE_URL}/health")
-        except:
-            pass
-
-        # 2. Ingest metrics
-        resource = random.choice(resources)
-        data = {
-            "resource_id": resource,
-            "cpu_usage": random.uniform(20, 95),
-            "memory_usage": random.uniform(30, 90),
-            "gpu_usage": random.uniform(0, 50),
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        try:
-            requests.post(f"{BASE_URL}/metrics/ingest", json=data)
-        except:
-            pass
-
-        # 3. Check SLA Risk
-        try:
-            requests.get(f"{BASE_URL}/sla/{resource}/risk")
-        except:
-            pass
-            
-        time.sleep(0.5)
-    print("Done! Generated 20 cycles of traffic.")
+    # Keep-alive session shared by all workers, with a connection pool
+    # large enough that no worker waits for a connection
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=WORKERS, pool_maxsize=WORKERS))
+    
+    print(f"Generating traffic with {WORKERS} workers...")
+    with session, ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        # Cycles are spread round-robin across resources and run in parallel
+        list(executor.map(
+            _one_cycle,
+            islice(cycle(resources), CYCLES),
+            [session] * CYCLES,
+        ))
+    print(f"Done! Generated {CYCLES} cycles of traffic.")
 
 if __name__ == "__main__":
     generate_traffic()
@@ -0,0 +1,29 @@
+"""Tests for Z-score anomaly detection."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.anomaly_service import AnomalyStatus, detect_anomaly
+from app.services.metric_service import MetricEntry, metric_service
+
+
+@pytest.mark.parametrize("value", [0.1, 33.3, 50.0])
+def test_constant_baseline_status_independent_of_window_size(value):
+    # Window size 10 is served from rolling statistics, 11 from a scan of
+    # the window; both must treat a constant baseline as zero variance
+    resource_id = f"constant-{value}"
+    t = datetime.now(timezone.utc) - timedelta(minutes=30)
+    for i in range(30):
+        metric_service.add_metric(
+            MetricEntry(resource_id, value, value, value, t + timedelta(seconds=i))
+        )
+    nudged = value + 1e-7
+    metric_service.add_metric(
+        MetricEntry(resource_id, nudged, nudged, nudged, t + timedelta(seconds=30))
+    )
+    
+    rolling = detect_anomaly(resource_id, window_size=10)
+    scanned = detect_anomaly(resource_id, window_size=11)
+    assert rolling.status == scanned.status == AnomalyStatus.OK
+    assert rolling.anomaly_metrics == scanned.anomaly_metrics == []
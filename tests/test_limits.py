@@ -0,0 +1,28 @@
+"""Tests for ingestion request limits."""
+
+from app.core import limits
+from app.core.limits import TokenBucketLimiter
+
+
+def test_rate_limit_applies_per_client():
+    limiter = TokenBucketLimiter(rate=1.0, burst=2)
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0.0
+    assert limiter.acquire("b") == 0.0
+
+
+def test_tracked_clients_bounded_least_recently_seen_first(monkeypatch):
+    monkeypatch.setattr(limits, "MAX_TRACKED_CLIENTS", 3)
+    limiter = TokenBucketLimiter(rate=0.001, burst=1)
+    
+    # "limited" exhausts its bucket, then stays recently seen while many
+    # other clients pass through
+    assert limiter.acquire("limited") == 0.0
+    for i in range(100):
+        limiter.acquire(f"client-{i}")
+        assert limiter.acquire("limited") > 0.0
+        assert len(limiter._buckets) <= 3
+    
+    # A client evicted as least recently seen starts with a fresh bucket
+    assert limiter.acquire("client-0") == 0.0
@@ -0,0 +1,156 @@
+"""Tests for the in-memory metric store."""
+
+import random
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services import metric_service as ms
+from app.services.metric_service import MetricEntry, MetricService
+
+WINDOW = ms.ROLLING_WINDOW_SIZE
+LOOKBACK_MINUTES = 60
+
+
+def _entry(value: float, timestamp: datetime, resource_id: str = "r") -> MetricEntry:
+    return MetricEntry(resource_id, value, value * 0.5, 100 - value, timestamp)
+
+
+def _assert_baseline_matches_scan(store: MetricService, resource_id: str = "r") -> None:
+    """Compare get_baseline against statistics recomputed from get_window."""
+    baseline = store.get_baseline(resource_id, LOOKBACK_MINUTES, WINDOW)
+    window = store.get_window(resource_id, LOOKBACK_MINUTES, limit=WINDOW + 1)
+    if len(window) < WINDOW + 1:
+        assert baseline is None
+        return
+    
+    assert baseline is not None
+    assert baseline.since == window.timestamps[0]
+    for i, column in enumerate((window.cpu_usage, window.memory_usage, window.gpu_usage)):
+        values = column[:-1]
+        assert baseline.latest[i] == column[-1]
+        assert baseline.means[i] == pytest.approx(statistics.fmean(values), rel=1e-9, abs=1e-9)
+        assert baseline.stds[i] == pytest.approx(statistics.stdev(values), rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_rolling_baseline_matches_window_scan(seed):
+    rng = random.Random(seed)
+    store = MetricService()
+    t = datetime.now(timezone.utc) - timedelta(minutes=30)
+    
+    for _ in range(rng.randint(5, 120)):
+        if rng.random() < 0.1:
+            # Out-of-order insert invalidates the rolling statistics
+            timestamp = t - timedelta(seconds=rng.randint(1, 200))
+        else:
+            t += timedelta(seconds=1)
+            timestamp = t
+        value = rng.choice([50.0, 50.0, rng.uniform(0, 100), round(rng.uniform(0, 100), 1)])
+        
+        if rng.random() < 0.2:
+            store.add_metrics([_entry(value, timestamp), _entry(rng.uniform(0, 100), timestamp)])
+        else:
+            store.add_metric(_entry(value, timestamp))
+        _assert_baseline_matches_scan(store)
+
+
+def test_constant_window_reports_zero_std():
+    store = MetricService()
+    t = datetime.now(timezone.utc) - timedelta(minutes=30)
+    
+    # Varied values first, so the constant window is reached by sliding
+    for i in range(25):
+        store.add_metric(_entry(float(i * 7 % 100), t + timedelta(seconds=i)))
+    for i in range(25, 25 + WINDOW + 1):
+        store.add_metric(_entry(33.3, t + timedelta(seconds=i)))
+    
+    baseline = store.get_baseline("r", LOOKBACK_MINUTES, WINDOW)
+    assert baseline.stds == (0.0, 0.0, 0.0)
+    assert baseline.means == (33.3, 33.3 * 0.5, 100 - 33.3)
+
+
+def test_small_variance_after_large_variance_is_rebuilt_exactly():
+    # A large-variance window leaves rounding error proportional to its M2
+    # in the sliding update; the drift guard must rebuild before that error
+    # dominates the following tiny variance
+    store = MetricService()
+    t = datetime.now(timezone.utc) - timedelta(minutes=30)
+    
+    for i in range(50):
+        store.add_metric(_entry(0.0 if i % 2 else 100.0, t + timedelta(seconds=i)))
+    for i in range(50, 50 + 3 * WINDOW):
+        store.add_metric(_entry(50.0 + 1e-4 * (i % 3), t + timedelta(seconds=i)))
+        baseline = store.get_baseline("r", LOOKBACK_MINUTES, WINDOW)
+        window = store.get_window("r", LOOKBACK_MINUTES, limit=WINDOW + 1)
+        expected = statistics.stdev(window.cpu_usage[:-1])
+        assert baseline.stds[0] == pytest.approx(expected, rel=1e-7, abs=1e-12)
+
+
+def test_baseline_unavailable_for_other_window_sizes_or_short_series():
+    store = MetricService()
+    t = datetime.now(timezone.utc)
+    for i in range(WINDOW):
+        store.add_metric(_entry(float(i), t + timedelta(seconds=i)))
+    
+    assert store.get_baseline("r", LOOKBACK_MINUTES, WINDOW) is None
+    store.add_metric(_entry(1.0, t + timedelta(seconds=WINDOW)))
+    assert store.get_baseline("r", LOOKBACK_MINUTES, WINDOW) is not None
+    assert store.get_baseline("r", LOOKBACK_MINUTES, WINDOW - 1) is None
+    assert store.get_baseline("missing", LOOKBACK_MINUTES, WINDOW) is None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_eviction_matches_truncated_list(seed, monkeypatch):
+    # Small limits so eviction crosses the compaction batch boundary often
+    monkeypatch.setattr(ms, "MAX_ENTRIES_PER_RESOURCE", 50)
+    monkeypatch.setattr(ms, "RETENTION_TRIM_BATCH", 7)
+    rng = random.Random(seed)
+    store = MetricService()
+    reference: list[tuple[datetime, float]] = []
+    t = datetime.now(timezone.utc) - timedelta(minutes=30)
+    
+    for i in range(rng.randint(1, 300)):
+        if rng.random() < 0.2:
+            timestamp = t - timedelta(seconds=rng.randint(0, 100))
+        else:
+            t += timedelta(seconds=1)
+            timestamp = t
+        value = float(i)
+        
+        if rng.random() < 0.2:
+            store.add_metrics([_entry(value, timestamp)])
+        else:
+            store.add_metric(_entry(value, timestamp))
+        
+        # Reference model: sorted insert after equal timestamps, then keep
+        # the most recent MAX_ENTRIES_PER_RESOURCE
+        position = sum(1 for ts, _ in reference if ts <= timestamp)
+        reference.insert(position, (timestamp, value))
+        reference = reference[-50:]
+        
+        window = store.get_window("r", LOOKBACK_MINUTES)
+        assert list(zip(window.timestamps, window.cpu_usage)) == reference
+        assert store.count("r") == len(reference)
+        assert store.get_latest_metric("r").cpu_usage == reference[-1][1]
+        
+        limit = rng.choice([1, 5, 20, 60])
+        limited = store.get_window("r", LOOKBACK_MINUTES, limit=limit)
+        assert list(zip(limited.timestamps, limited.cpu_usage)) == reference[-limit:]
+        _assert_baseline_matches_scan(store)
+
+
+def test_lookback_cutoff_skips_evicted_entries(monkeypatch):
+    monkeypatch.setattr(ms, "MAX_ENTRIES_PER_RESOURCE", 5)
+    monkeypatch.setattr(ms, "RETENTION_TRIM_BATCH", 100)
+    store = MetricService()
+    now = datetime.now(timezone.utc)
+    
+    # Evicted entries fall inside the lookback but must not be returned
+    for i in range(12):
+        store.add_metric(_entry(float(i), now - timedelta(minutes=12 - i)))
+    
+    window = store.get_window("r", minutes=30)
+    assert list(window.cpu_usage) == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert list(store.get_window("r", minutes=3).cpu_usage) == [10.0, 11.0]
@@ -0,0 +1,41 @@
+"""Tests for the metrics API endpoints."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metric_service import MetricEntry, metric_service
+
+client = TestClient(app)
+
+
+def test_batch_ingest_malformed_json_does_not_echo_body():
+    body = b'{"metrics": [' + b'1, ' * 10000
+    response = client.post(
+        "/api/v1/metrics/ingest/batch",
+        content=body,
+        headers={"content-type": "application/json"},
+    )
+    
+    assert response.status_code == 422
+    (error,) = response.json()["detail"]
+    assert error["type"] == "json_invalid"
+    assert error["loc"] == ["body"]
+    assert error["input"] == {}
+    assert len(response.content) < 1024
+
+
+@pytest.mark.parametrize("stale_count", [5, 15])
+def test_analyze_reports_lookback_count_not_stored_count(stale_count):
+    resource_id = f"stale-{stale_count}"
+    old = datetime.now(timezone.utc) - timedelta(hours=2)
+    for i in range(stale_count):
+        metric_service.add_metric(
+            MetricEntry(resource_id, 50.0, 50.0, 50.0, old + timedelta(seconds=i))
+        )
+    
+    response = client.get(f"/api/v1/metrics/{resource_id}/analyze")
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"No metrics available for resource '{resource_id}'"
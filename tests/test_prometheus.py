@@ -0,0 +1,41 @@
+"""Tests for Prometheus exposition helpers."""
+
+import pytest
+from prometheus_client import CollectorRegistry, Counter
+
+from app.core.prometheus import BatchedCounter, _accepts_gzip
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "expected"),
+    [
+        ("", False),
+        ("identity", False),
+        ("gzip", True),
+        ("deflate, gzip", True),
+        ("GZIP; q=0.5", True),
+        ("x-gzip", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("deflate, gzip;q=0.0", False),
+        ("*;q=0", False),
+        ("*, gzip;q=0", False),
+        ("gzip;q=0, *", False),
+        ("gzip;q=invalid", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding, expected):
+    assert _accepts_gzip(accept_encoding) is expected
+
+
+def test_batched_counter_exports_exact_totals():
+    registry = CollectorRegistry()
+    counter = BatchedCounter(
+        Counter("batched_test_total", "Test counter", registry=registry), flush_every=4
+    )
+    for _ in range(10):
+        counter.inc()
+    counter.inc(25)
+    counter.inc()
+    counter.flush()
+    assert registry.get_sample_value("batched_test_total") == 36